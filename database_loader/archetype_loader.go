@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bufio"
 	"encoding/json"
 	"fmt"
 	"os"
@@ -20,38 +21,43 @@ type ArchetypesData struct {
 }
 
 func archDisplay(archetypes *ArchetypesData) {
+	out := bufio.NewWriter(os.Stdout)
+	defer out.Flush()
+
 	for key, archetype := range archetypes.Archetypes {
-		fmt.Println(key, archetype)
+		fmt.Fprintln(out, key, archetype)
 	}
 }
 
 func archLoadJSON(fileName string) (*ArchetypesData, error) {
-	file, err := os.ReadFile(fileName)
-	if err != nil {
-		return nil, err
-	}
+	data := ArchetypesData{Archetypes: make(map[string]Archetype)}
+
+	err := jsonStreamField(fileName, "archetypes", func(dec *json.Decoder) error {
+		present, err := jsonStreamObject(dec, func(key string) error {
+			var archetype Archetype
+			if err := dec.Decode(&archetype); err != nil {
+				return err
+			}
 
-	var data ArchetypesData
-	err = json.Unmarshal(file, &data)
+			// Print a line for each archetype as it is loaded.
+			fmt.Printf("Loaded archetype '%s': %s - %s\n", key, archetype.Name, archetype.Description)
+			data.Archetypes[key] = archetype
+			return nil
+		})
+		// As with json.Unmarshal, a repeated key merges into the map and null clears it.
+		if err == nil && !present {
+			data.Archetypes = make(map[string]Archetype)
+		}
+		return err
+	})
 	if err != nil {
 		return nil, err
 	}
 
-	// Iterate over the loaded archetypes and print a line for each.
-	for key, archetype := range data.Archetypes {
-		fmt.Printf("Loaded archetype '%s': %s - %s\n", key, archetype.Name, archetype.Description)
-	}
-
 	return &data, nil
 }
 
-func archWriteBolt(archetypes *ArchetypesData, dbPath string) error {
-	db, err := bolt.Open(dbPath, 0600, nil)
-	if err != nil {
-		return err
-	}
-	defer db.Close()
-
+func archWriteBolt(archetypes *ArchetypesData, db *bolt.DB) error {
 	return db.Update(func(tx *bolt.Tx) error {
 		bucket, err := tx.CreateBucketIfNotExists([]byte("Archetypes"))
 		if err != nil {
@@ -72,16 +78,10 @@ func archWriteBolt(archetypes *ArchetypesData, dbPath string) error {
 	})
 }
 
-func archLoadBolt(dbPath string) (*ArchetypesData, error) {
-	db, err := bolt.Open(dbPath, 0600, &bolt.Options{ReadOnly: true})
-	if err != nil {
-		return nil, err
-	}
-	defer db.Close()
-
+func archLoadBolt(db *bolt.DB) (*ArchetypesData, error) {
 	archetypesData := &ArchetypesData{Archetypes: make(map[string]Archetype)}
 
-	err = db.View(func(tx *bolt.Tx) error {
+	err := db.View(func(tx *bolt.Tx) error {
 		bucket := tx.Bucket([]byte("Archetypes"))
 		if bucket == nil {
 			return fmt.Errorf("archetypes bucket does not exist")
@@ -4,6 +4,9 @@ import (
 	"flag"
 	"fmt"
 	"log"
+	"sync"
+
+	bolt "go.etcd.io/bbolt"
 )
 
 func main() {
@@ -11,6 +14,7 @@ func main() {
 	jsonArchFilePath := flag.String("a", "test_archetypes.json", "Path to the Archetypes JSON file.")
 	jsonProtoFilePath := flag.String("p", "test_prototypes.json", "Path to the Prototypes JSON file.")
 	boltFilePath := flag.String("b", "test_data.bolt", "Path to the Bolt DB file.")
+	verify := flag.Bool("v", false, "Load the stored data back from BoltDB and display it.")
 	help := flag.Bool("h", false, "Display help.")
 
 	flag.Parse()
@@ -25,16 +29,25 @@ func main() {
 		fmt.Println("        Path to the Prototypes JSON file. (default \"test_prototypes.json\")")
 		fmt.Println("  -b string")
 		fmt.Println("        Path to the Bolt DB file. (default \"test_data.bolt\")")
+		fmt.Println("  -v")
+		fmt.Println("        Load the stored data back from BoltDB and display it.")
 		fmt.Println("  -h")
 		fmt.Println("        Display help.")
 		return
 	}
 
+	// Open the BoltDB file once and share the handle across every load and write
+	db, err := bolt.Open(*boltFilePath, 0600, nil)
+	if err != nil {
+		log.Fatalf("Failed to open BoltDB file: %v", err)
+	}
+	defer db.Close()
+
 	// Initialize the rooms map
 	rooms := make(map[int64]*Room)
 
 	// Load data from BoltDB
-	rooms, err := roomLoadBolt(rooms, *boltFilePath)
+	rooms, err = roomLoadBolt(rooms, db)
 	if err != nil {
 		fmt.Println("Room data load from BoltDB failed:", err)
 	} else {
@@ -62,7 +75,7 @@ func main() {
 	}
 
 	// Write data to BoltDB
-	err = roomWriteBolt(rooms, *boltFilePath)
+	err = roomWriteBolt(rooms, db)
 	if err != nil {
 		fmt.Println("Room data write failed:", err)
 		return // Ensure to exit if writing fails
@@ -71,7 +84,7 @@ func main() {
 	}
 
 	// Store the data in BoltDB
-	err = archWriteBolt(archetypesData, *boltFilePath)
+	err = archWriteBolt(archetypesData, db)
 	if err != nil {
 		log.Fatalf("Failed to store Archetype data in BoltDB: %v", err)
 	}
@@ -79,31 +92,49 @@ func main() {
 	fmt.Println("Archetype Data successfully stored in BoltDB.")
 
 	// Store the data in BoltDB
-	err = protoWriteBolt(prototypesData, *boltFilePath)
+	err = protoWriteBolt(prototypesData, db)
 	if err != nil {
 		log.Fatalf("Failed to store Prototype data in BoltDB: %v", err)
 	}
 
 	fmt.Println("Prototype Data successfully stored in BoltDB.")
 
-	// Load data from BoltDB
-	rooms, err = roomLoadBolt(rooms, *boltFilePath)
-	if err != nil {
-		fmt.Println("Room data load from BoltDB failed:", err)
+	// Reading everything back is only needed to verify the import
+	if !*verify {
+		return
+	}
+
+	// The buckets are independent and Bolt allows concurrent read transactions
+	var wg sync.WaitGroup
+	var roomErr, archErr, protoErr error
+
+	wg.Add(3)
+	go func() {
+		defer wg.Done()
+		rooms, roomErr = roomLoadBolt(rooms, db)
+	}()
+	go func() {
+		defer wg.Done()
+		archetypesData, archErr = archLoadBolt(db)
+	}()
+	go func() {
+		defer wg.Done()
+		prototypesData, protoErr = protoLoadBolt(db)
+	}()
+	wg.Wait()
+
+	if roomErr != nil {
+		fmt.Println("Room data load from BoltDB failed:", roomErr)
 	} else {
 		fmt.Println("Room data loaded from BoltDB successfully")
 	}
 
-	// Load the data from BoltDB
-	archetypesData, err = archLoadBolt(*boltFilePath)
-	if err != nil {
-		log.Fatalf("Failed to load Archetype data from BoltDB: %v", err)
+	if archErr != nil {
+		log.Fatalf("Failed to load Archetype data from BoltDB: %v", archErr)
 	}
 
-	// Load the data from BoltDB
-	prototypesData, err = protoLoadBolt(*boltFilePath)
-	if err != nil {
-		log.Fatalf("Failed to load Prototype data from BoltDB: %v", err)
+	if protoErr != nil {
+		log.Fatalf("Failed to load Prototype data from BoltDB: %v", protoErr)
 	}
 
 	// Display the rooms
@@ -0,0 +1,123 @@
+package main
+
+import (
+	"encoding/json"
+	"fmt"
+	"os"
+	"strings"
+)
+
+// jsonStreamField opens fileName and walks its top-level object, handing the
+// decoder to fn once it is positioned on the value of field. Other fields are
+// skipped, so the document is never read into memory in one piece.
+func jsonStreamField(fileName string, field string, fn func(dec *json.Decoder) error) error {
+	file, err := os.Open(fileName)
+	if err != nil {
+		return fmt.Errorf("error reading file: %w", err)
+	}
+	defer file.Close()
+
+	dec := json.NewDecoder(file)
+
+	// A null document holds no fields, as with json.Unmarshal
+	if present, err := jsonOpenDelim(dec, '{'); err != nil || !present {
+		return err
+	}
+
+	for dec.More() {
+		token, err := dec.Token()
+		if err != nil {
+			return fmt.Errorf("error reading JSON key: %w", err)
+		}
+
+		if key, ok := token.(string); ok && strings.EqualFold(key, field) {
+			if err := fn(dec); err != nil {
+				return err
+			}
+			continue
+		}
+
+		var skip json.RawMessage
+		if err := dec.Decode(&skip); err != nil {
+			return fmt.Errorf("error skipping JSON value: %w", err)
+		}
+	}
+
+	return jsonExpectDelim(dec, '}')
+}
+
+// jsonStreamObject calls fn for each key of the JSON object at the decoder's
+// position; fn is expected to decode the matching value. A null value is
+// accepted as an empty object, and present reports whether an object was read.
+func jsonStreamObject(dec *json.Decoder, fn func(key string) error) (bool, error) {
+	if present, err := jsonOpenDelim(dec, '{'); err != nil || !present {
+		return false, err
+	}
+
+	for dec.More() {
+		token, err := dec.Token()
+		if err != nil {
+			return true, fmt.Errorf("error reading JSON key: %w", err)
+		}
+
+		key, ok := token.(string)
+		if !ok {
+			return true, fmt.Errorf("unexpected JSON key %v", token)
+		}
+
+		if err := fn(key); err != nil {
+			return true, err
+		}
+	}
+
+	return true, jsonExpectDelim(dec, '}')
+}
+
+// jsonStreamArray calls fn for each element of the JSON array at the decoder's
+// position; fn is expected to decode the element. A null value is accepted as
+// an empty array.
+func jsonStreamArray(dec *json.Decoder, fn func() error) error {
+	if present, err := jsonOpenDelim(dec, '['); err != nil || !present {
+		return err
+	}
+
+	for dec.More() {
+		if err := fn(); err != nil {
+			return err
+		}
+	}
+
+	return jsonExpectDelim(dec, ']')
+}
+
+// jsonOpenDelim reads the opening delimiter of a JSON object or array,
+// returning false without error if the value is null instead.
+func jsonOpenDelim(dec *json.Decoder, delim json.Delim) (bool, error) {
+	token, err := dec.Token()
+	if err != nil {
+		return false, fmt.Errorf("error reading JSON: %w", err)
+	}
+
+	if token == nil {
+		return false, nil
+	}
+
+	if d, ok := token.(json.Delim); !ok || d != delim {
+		return false, fmt.Errorf("expected JSON %v, found %v", delim, token)
+	}
+
+	return true, nil
+}
+
+func jsonExpectDelim(dec *json.Decoder, delim json.Delim) error {
+	token, err := dec.Token()
+	if err != nil {
+		return fmt.Errorf("error reading JSON: %w", err)
+	}
+
+	if d, ok := token.(json.Delim); !ok || d != delim {
+		return fmt.Errorf("expected JSON %v, found %v", delim, token)
+	}
+
+	return nil
+}
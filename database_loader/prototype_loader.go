@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bufio"
 	"encoding/json"
 	"fmt"
 	"os"
@@ -35,38 +36,40 @@ type PrototypesData struct {
 }
 
 func protoDisplay(prototypes *PrototypesData) {
+	out := bufio.NewWriter(os.Stdout)
+	defer out.Flush()
+
 	for _, prototype := range prototypes.ObjectPrototypes {
-		fmt.Println(prototype)
+		fmt.Fprintln(out, prototype)
 	}
 }
 
 func protoLoadJSON(fileName string) (*PrototypesData, error) {
-	file, err := os.ReadFile(fileName)
-	if err != nil {
-		return nil, err
-	}
-
 	var data PrototypesData
-	err = json.Unmarshal(file, &data)
+
+	err := jsonStreamField(fileName, "objectPrototypes", func(dec *json.Decoder) error {
+		// As with json.Unmarshal, a repeated key replaces the list rather than extending it.
+		data.ObjectPrototypes = nil
+		return jsonStreamArray(dec, func() error {
+			var prototype ObjectData
+			if err := dec.Decode(&prototype); err != nil {
+				return err
+			}
+
+			// Print a line for each prototype as it is loaded.
+			fmt.Printf("Loaded prototype: %s - %s\n", prototype.Name, prototype.Description)
+			data.ObjectPrototypes = append(data.ObjectPrototypes, prototype)
+			return nil
+		})
+	})
 	if err != nil {
 		return nil, err
 	}
 
-	// Iterate over the loaded prototypes and print a line for each.
-	for _, prototype := range data.ObjectPrototypes {
-		fmt.Printf("Loaded prototype: %s - %s\n", prototype.Name, prototype.Description)
-	}
-
 	return &data, nil
 }
 
-func protoWriteBolt(prototypes *PrototypesData, dbPath string) error {
-	db, err := bolt.Open(dbPath, 0600, nil)
-	if err != nil {
-		return err
-	}
-	defer db.Close()
-
+func protoWriteBolt(prototypes *PrototypesData, db *bolt.DB) error {
 	return db.Update(func(tx *bolt.Tx) error {
 		bucket, err := tx.CreateBucketIfNotExists([]byte("Prototypes"))
 		if err != nil {
@@ -88,16 +91,10 @@ func protoWriteBolt(prototypes *PrototypesData, dbPath string) error {
 	})
 }
 
-func protoLoadBolt(dbPath string) (*PrototypesData, error) {
-	db, err := bolt.Open(dbPath, 0600, &bolt.Options{ReadOnly: true})
-	if err != nil {
-		return nil, err
-	}
-	defer db.Close()
-
+func protoLoadBolt(db *bolt.DB) (*PrototypesData, error) {
 	prototypesData := &PrototypesData{}
 
-	err = db.View(func(tx *bolt.Tx) error {
+	err := db.View(func(tx *bolt.Tx) error {
 		bucket := tx.Bucket([]byte("Prototypes"))
 		if bucket == nil {
 			return fmt.Errorf("prototypes bucket does not exist")
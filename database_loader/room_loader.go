@@ -1,6 +1,7 @@
 package main
 
 import (
+	"bufio"
 	"encoding/json"
 	"fmt"
 	"os"
@@ -64,85 +65,92 @@ type Room struct {
 }
 
 func roomDisplay(rooms map[int64]*Room) {
-	fmt.Println("Rooms:")
+	out := bufio.NewWriter(os.Stdout)
+	defer out.Flush()
+
+	fmt.Fprintln(out, "Rooms:")
 	for _, room := range rooms {
-		fmt.Printf("Room %d: %s\n", room.RoomID, room.Title)
+		fmt.Fprintf(out, "Room %d: %s\n", room.RoomID, room.Title)
 		for _, exit := range room.Exits {
-			fmt.Printf("  Exit %s to room %d (%s)\n", exit.Direction, exit.TargetRoom, rooms[exit.TargetRoom].Title)
+			fmt.Fprintf(out, "  Exit %s to room %d (%s)\n", exit.Direction, exit.TargetRoom, rooms[exit.TargetRoom].Title)
 		}
 	}
 }
 
 func roomLoadJSON(rooms map[int64]*Room, fileName string) (map[int64]*Room, error) {
-	byteValue, err := os.ReadFile(fileName)
-	if err != nil {
-		return rooms, fmt.Errorf("error reading file: %w", err)
-	}
-
-	var data struct {
-		Rooms map[string]struct {
-			Area      string `json:"area"`
-			Title     string `json:"title"`
-			Narrative string `json:"description"`
-			Exits     []struct {
-				ExitName     string `json:"direction"`
-				Visible      bool   `json:"visible"`
-				TargetRoomID int64  `json:"target_room"`
-			} `json:"exits"`
-		} `json:"rooms"`
-	}
-
-	if err := json.Unmarshal(byteValue, &data); err != nil {
-		return rooms, fmt.Errorf("error unmarshalling JSON: %w", err)
+	type roomData struct {
+		Area      string `json:"area"`
+		Title     string `json:"title"`
+		Narrative string `json:"description"`
+		Exits     []struct {
+			ExitName     string `json:"direction"`
+			Visible      bool   `json:"visible"`
+			TargetRoomID int64  `json:"target_room"`
+		} `json:"exits"`
 	}
 
 	index := &Index{}
 	index.Initialize(rooms)
 
-	for id, roomData := range data.Rooms {
-		roomID, err := strconv.ParseInt(id, 10, 64)
-		if err != nil {
-			return rooms, fmt.Errorf("error parsing room ID '%s': %w", id, err)
-		}
-		room := &Room{
-			RoomID:      roomID,
-			Area:        roomData.Area,
-			Title:       roomData.Title,
-			Description: roomData.Narrative,
-			Exits:       make(map[string]*Exit),
-		}
+	// Rooms are decoded one at a time and only merged once the whole file parses.
+	loaded := make(map[int64]*Room)
 
-		rooms[roomID] = room
+	err := jsonStreamField(fileName, "rooms", func(dec *json.Decoder) error {
+		present, err := jsonStreamObject(dec, func(id string) error {
+			var data roomData
+			if err := dec.Decode(&data); err != nil {
+				return fmt.Errorf("error unmarshalling JSON: %w", err)
+			}
+
+			roomID, err := strconv.ParseInt(id, 10, 64)
+			if err != nil {
+				return fmt.Errorf("error parsing room ID '%s': %w", id, err)
+			}
+			room := &Room{
+				RoomID:      roomID,
+				Area:        data.Area,
+				Title:       data.Title,
+				Description: data.Narrative,
+				Exits:       make(map[string]*Exit, len(data.Exits)),
+			}
 
-		for _, exitData := range roomData.Exits {
-			exit := Exit{
-				ExitID:     index.GetID(),
-				TargetRoom: exitData.TargetRoomID,
-				Visible:    exitData.Visible,
-				Direction:  exitData.ExitName,
+			loaded[roomID] = room
+
+			for _, exitData := range data.Exits {
+				room.Exits[exitData.ExitName] = &Exit{
+					ExitID:     index.GetID(),
+					TargetRoom: exitData.TargetRoomID,
+					Visible:    exitData.Visible,
+					Direction:  exitData.ExitName,
+				}
 			}
 
-			room.Exits[exit.Direction] = &exit
+			return nil
+		})
+		// As with json.Unmarshal, a repeated key merges into the map and null clears it.
+		if err == nil && !present {
+			loaded = make(map[int64]*Room)
 		}
+		return err
+	})
+	if err != nil {
+		return rooms, err
+	}
+
+	for roomID, room := range loaded {
+		rooms[roomID] = room
 	}
 
 	return rooms, nil
 }
 
-func roomLoadBolt(rooms map[int64]*Room, fileName string) (map[int64]*Room, error) {
+func roomLoadBolt(rooms map[int64]*Room, db *bolt.DB) (map[int64]*Room, error) {
 
 	if rooms == nil {
 		rooms = make(map[int64]*Room)
 	}
 
-	db, err := bolt.Open(fileName, 0600, nil)
-	if err != nil {
-		fmt.Printf("Error opening BoltDB file: %v\n", err)
-		return rooms, fmt.Errorf("error opening BoltDB file: %w", err)
-	}
-	defer db.Close()
-
-	err = db.View(func(tx *bolt.Tx) error {
+	err := db.View(func(tx *bolt.Tx) error {
 		roomsBucket := tx.Bucket([]byte("Rooms"))
 		if roomsBucket == nil {
 			fmt.Println("Rooms bucket not found")
@@ -209,13 +217,7 @@ func roomLoadBolt(rooms map[int64]*Room, fileName string) (map[int64]*Room, erro
 	return rooms, nil
 }
 
-func roomWriteBolt(rooms map[int64]*Room, dbPath string) error {
-	db, err := bolt.Open(dbPath, 0600, nil)
-	if err != nil {
-		return fmt.Errorf("error opening database: %v", err)
-	}
-	defer db.Close()
-
+func roomWriteBolt(rooms map[int64]*Room, db *bolt.DB) error {
 	// db.Update returns an error, which we directly return to the caller.
 	return db.Update(func(tx *bolt.Tx) error {
 		roomsBucket, err := tx.CreateBucketIfNotExists([]byte("Rooms"))
@@ -248,7 +250,7 @@ func roomWriteBolt(rooms map[int64]*Room, dbPath string) error {
 				if err != nil {
 					return err
 				}
-				exitKey := fmt.Sprintf("%d_%s", room.RoomID, dir)
+				exitKey := roomKey + "_" + dir
 				if err := exitsBucket.Put([]byte(exitKey), exitData); err != nil {
 					return err
 				}
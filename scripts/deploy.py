@@ -5,7 +5,16 @@ This project is licensed under the Apache 2.0 License. See the LICENSE file for
 """
 
 import json
-import boto3
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Optional
+
+log = logging.getLogger("mud.deploy")
 
 # Constants for stack names
 COGNITO_STACK_NAME = "MUD-Cognito-Stack"
@@ -15,93 +24,182 @@ CODEBUILD_STACK_NAME = "MUD-CodeBuild-Stack"
 COGNITO_TEMPLATE_PATH = "../cloudformation/cognito.yml"
 CODEBUILD_TEMPLATE_PATH = "../cloudformation/codebuild.yml"
 
-# Configuration file path
+# Configuration file path, and the template it starts from on a first deploy
 CONFIG_PATH = "../mud/config.json"
+CONFIG_TEMPLATE_PATH = "../mud/config.template.json"
+
+# Parameters prompted for each template, as (key, description, default)
+PROMPTS = {
+    "cognito": [
+        ("UserPoolName", "Name of the user pool", "mud-user-pool"),
+        ("AppClientName", "Name of the app client", "mud-app-client"),
+        ("CallbackURL", "URL of the callback for the app client", "https://localhost:3000/callback"),
+        ("SignOutURL", "URL of the sign-out page for the app client", "https://localhost:3000/sign-out"),
+        ("ReplyEmailAddress", "email address to send from", ""),
+    ],
+    "codebuild": [
+        ("GitHubSourceRepo", "GitHub repository URL for the source code", ""),
+        ("S3BucketName", "name of the S3 bucket where build artifacts will be stored", ""),
+    ],
+}
+
+# Delay between CloudFormation status polls and the number of polls before giving up
+WAITER_DELAY = 5
+WAITER_MAX_ATTEMPTS = 720
+
+# Client retry configuration so throttled API calls back off adaptively instead of failing,
+# and socket timeouts in seconds so a stalled request is retried rather than waited on
+CLIENT_RETRIES = {"max_attempts": 10, "mode": "adaptive"}
+CLIENT_CONNECT_TIMEOUT = 5
+CLIENT_READ_TIMEOUT = 20
+
+# Error codes returned for throttled requests, and how many times to try before giving up
+THROTTLING_ERROR_CODES = {"Throttling", "ThrottlingException", "RequestLimitExceeded"}
+THROTTLE_ATTEMPTS = 6
+
+# Template bodies keyed by path, along with the (mtime, size) they were read at
+_TEMPLATE_CACHE: dict = {}
 
 
 def prompt_for_parameters(template_name) -> dict:
     """
-    Prompts the user for parameters based on the specified template name.
+    Collects the parameters for the specified template name.
+    Each value is taken from its MUD_<KEY> environment variable when set, otherwise the user is prompted.
     """
-    if template_name == "cognito":
-        parameters: dict = {
-            "UserPoolName": input("Enter the Name of the user pool [default: mud-user-pool]: ") or "mud-user-pool",
-            "AppClientName": input("Enter the Name of the app client [default: mud-app-client]: ") or "mud-app-client",
-            "CallbackURL": input("Enter the URL of the callback for the app client [default: https://localhost:3000/callback]: ") or "https://localhost:3000/callback",
-            "SignOutURL": input("Enter the URL of the sign-out page for the app client [default: https://localhost:3000/sign-out]: ") or "https://localhost:3000/sign-out",
-            "ReplyEmailAddress": input("Enter the email address to send from: "),
-        }
-    elif template_name == "codebuild":
-        parameters = {
-            "GitHubSourceRepo": input("Enter the GitHub repository URL for the source code: "),
-            "S3BucketName": input("Enter the name of the S3 bucket where build artifacts will be stored: "),
-        }
+    parameters: dict = {}
+    for key, description, default in PROMPTS[template_name]:
+        value = os.environ.get(f"MUD_{key.upper()}")
+        if not value:
+            prompt = f"Enter the {description} [default: {default}]: " if default else f"Enter the {description}: "
+            value = input(prompt) or default
+        parameters[key] = value
     return parameters
 
 
 def load_template(template_path) -> str:
     """
     Loads a CloudFormation template from the specified path.
+    The body is cached and only re-read when the file's mtime or size changes.
     """
+    stat = os.stat(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _TEMPLATE_CACHE.get(template_path)
+    if cached and cached[0] == version:
+        return cached[1]
+
     with open(template_path, "r", encoding="utf-8") as file:
-        return file.read()
+        template_body = file.read()
+
+    _TEMPLATE_CACHE[template_path] = (version, template_body)
+    return template_body
 
 
-def deploy_stack(client, stack_name, template_body, parameters) -> None:
+def deploy_stack(client, stack_name, template_body, parameters) -> Optional[dict]:
     """
     Deploy or update a CloudFormation stack with the given parameters.
+    Returns the stack outputs once the operation completes, or None if it failed.
     """
-    cf_parameters: list = [{"ParameterKey": k, "ParameterValue": v} for k, v in parameters.items()]
     try:
-        if stack_exists(client, stack_name):
-            print(f"Updating existing stack: {stack_name}")
-            client.update_stack(
-                StackName=stack_name,
-                TemplateBody=template_body,
-                Parameters=cf_parameters,
-                Capabilities=["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
-            )
-        else:
-            print(f"Creating new stack: {stack_name}")
-            client.create_stack(
-                StackName=stack_name,
-                TemplateBody=template_body,
-                Parameters=cf_parameters,
-                Capabilities=["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
-            )
-        wait_for_stack_completion(client, stack_name)
-    except client.exceptions.ClientError as err:
-        print(f"Error in stack operation: {err}")
+        cf_parameters: list = build_stack_parameters(parameters, get_template_parameters(client, template_body))
+        stack_args: dict = {
+            "StackName": stack_name,
+            "TemplateBody": template_body,
+            "Parameters": cf_parameters,
+            "Capabilities": ["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM"],
+        }
+        # Try the update first and fall back to creating the stack, rather than describing it to decide
+        try:
+            call_with_backoff(client, client.update_stack, **stack_args)
+            log.info("Updating existing stack: %s", stack_name)
+            is_update = True
+        except client.exceptions.ClientError as err:
+            if "does not exist" in str(err):
+                log.info("Creating new stack: %s", stack_name)
+                call_with_backoff(client, client.create_stack, **stack_args)
+                is_update = False
+            elif "No updates are to be performed" in str(err):
+                log.info("Stack %s is already up to date.", stack_name)
+                return get_stack_outputs(describe_stack(client, stack_name))
+            else:
+                raise
+        return get_stack_outputs(wait_for_stack_completion(client, stack_name, is_update))
+    except (client.exceptions.ClientError, RuntimeError) as err:
+        log.error("Error in stack operation: %s", err)
+        return None
+
+
+def call_with_backoff(client, operation, **kwargs):
+    """
+    Calls a CloudFormation operation, retrying throttled requests with jittered exponential backoff.
+    Any other error is raised immediately.
+    """
+    for attempt in range(THROTTLE_ATTEMPTS):
+        try:
+            return operation(**kwargs)
+        except client.exceptions.ClientError as err:
+            if err.response["Error"]["Code"] not in THROTTLING_ERROR_CODES or attempt == THROTTLE_ATTEMPTS - 1:
+                raise
+            delay = min(30, 0.5 * 2**attempt) + random.random()
+            log.warning("Request throttled, retrying in %.1f seconds", delay)
+            time.sleep(delay)
+
+
+def build_stack_parameters(parameters, declared) -> list:
+    """
+    Converts a parameter dict into the CloudFormation Parameters list, keeping only the declared keys.
+    CloudFormation requires string values, so every value is converted once here.
+    """
+    return [{"ParameterKey": k, "ParameterValue": str(v)} for k, v in parameters.items() if k in declared]
 
 
-def stack_exists(client, stack_name) -> bool:
+def get_template_parameters(client, template_body) -> set:
     """
-    Check if a CloudFormation stack exists.
+    Returns the names of the parameters declared by a CloudFormation template.
+    This also validates the template before any stack operation is attempted.
     """
-    try:
-        client.describe_stacks(StackName=stack_name)
-        return True
-    except client.exceptions.ClientError:
-        return False
+    summary = client.get_template_summary(TemplateBody=template_body)
+    return {parameter["ParameterKey"] for parameter in summary.get("Parameters", [])}
 
 
-def wait_for_stack_completion(client, stack_name) -> None:
+def describe_stack(client, stack_name) -> Optional[dict]:
     """
-    Wait for the CloudFormation stack to complete its operation.
+    Describe a CloudFormation stack, returning None if it does not exist.
     """
-    waiter = client.get_waiter("stack_create_complete")
-    print(f"Waiting for stack {stack_name} to complete...")
-    waiter.wait(StackName=stack_name)
-    print("Stack operation completed.")
+    try:
+        return client.describe_stacks(StackName=stack_name)["Stacks"][0]
+    except client.exceptions.ClientError as err:
+        if "does not exist" in str(err):
+            return None
+        raise
 
 
-def get_stack_outputs(client, stack_name) -> dict:
+def wait_for_stack_completion(client, stack_name, is_update=False) -> dict:
+    """
+    Wait for the CloudFormation stack to complete its create or update operation, returning the final stack description.
+    Raises RuntimeError as soon as the stack starts failing or rolling back, rather than waiting for the rollback to finish.
+    """
+    target_status = "UPDATE_COMPLETE" if is_update else "CREATE_COMPLETE"
+    log.info("Waiting for stack %s to complete...", stack_name)
+    for _ in range(WAITER_MAX_ATTEMPTS):
+        stack = describe_stack(client, stack_name)
+        status = stack["StackStatus"] if stack else "DELETE_COMPLETE"
+        if status == target_status:
+            log.info("Stack operation completed.")
+            return stack
+        if "FAILED" in status or "ROLLBACK" in status or status.startswith("DELETE_"):
+            raise RuntimeError(f"Stack {stack_name} entered state {status}")
+        time.sleep(WAITER_DELAY)
+    raise RuntimeError(f"Timed out waiting for stack {stack_name} to complete")
+
+
+def get_stack_outputs(stack) -> dict:
     """
-    Retrieve the outputs of a CloudFormation stack.
+    Retrieve the outputs from a described CloudFormation stack.
     """
-    stack = client.describe_stacks(StackName=stack_name)
-    outputs = stack["Stacks"][0]["Outputs"]
-    return {output["OutputKey"]: output["OutputValue"] for output in outputs}
+    if not stack:
+        return {}
+    return {output["OutputKey"]: output["OutputValue"] for output in stack.get("Outputs", [])}
 
 
 def start_codebuild_project(codebuild_client, project_name):
@@ -110,7 +208,7 @@ def start_codebuild_project(codebuild_client, project_name):
     """
     response = codebuild_client.start_build(projectName=project_name)
     build_id = response['build']['id']
-    print(f"Started CodeBuild project: {project_name}, Build ID: {build_id}")
+    log.info("Started CodeBuild project: %s, Build ID: %s", project_name, build_id)
     return build_id
 
 
@@ -118,47 +216,83 @@ def wait_for_codebuild_completion(codebuild_client, build_id):
     """
     Waits for the specified CodeBuild project build to complete.
     """
-    print(f"Waiting for CodeBuild build {build_id} to complete...")
+    log.info("Waiting for CodeBuild build %s to complete...", build_id)
     waiter = codebuild_client.get_waiter('build_completed')
     waiter.wait(ids=[build_id])
-    print("CodeBuild build completed.")
+    log.info("CodeBuild build completed.")
 
 
 def update_configuration_file(config_updates) -> None:
     """
     Updates the config.json file based on the provided parameters.
+    The file is created from the config template if it does not exist yet.
+    The file is only rewritten when a value changes, and is replaced atomically.
     """
     try:
-        with open(CONFIG_PATH, "r", encoding="utf-8") as file:
+        config_source = CONFIG_PATH if os.path.exists(CONFIG_PATH) else CONFIG_TEMPLATE_PATH
+        with open(config_source, "r", encoding="utf-8") as file:
             config = json.load(file)
 
-        config.update(config_updates)
-
-        with open(CONFIG_PATH, "w", encoding="utf-8") as file:
-            json.dump(config, file, indent=4)
-
-        print("Configuration file updated successfully.")
+        updated_config = {**config, **config_updates}
+        if config_source == CONFIG_PATH and updated_config == config:
+            log.info("Configuration file is already up to date.")
+            return
+
+        # Serialize up front so the file receives a single write
+        config_text = json.dumps(updated_config, indent=4)
+
+        config_dir = os.path.dirname(os.path.abspath(CONFIG_PATH))
+        temp_file = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=config_dir, suffix=".tmp", delete=False)
+        try:
+            with temp_file as file:
+                file.write(config_text)
+
+            # A new config holds the client secret, so it keeps the temporary file's owner-only mode
+            if config_source == CONFIG_PATH:
+                shutil.copymode(CONFIG_PATH, temp_file.name)
+            os.replace(temp_file.name, CONFIG_PATH)
+        except Exception:
+            # Don't leave a stray copy of the config, and its client secret, next to config.json
+            os.unlink(temp_file.name)
+            raise
+
+        log.info("Configuration file updated successfully.")
     except Exception as err:
-        print(f"An error occurred while updating configuration file: {err}")
+        log.error("An error occurred while updating configuration file: %s", err)
 
 
 def main() -> None:
-    # Initialize Boto3 clients
-    cloudformation_client = boto3.client("cloudformation")
-    codebuild_client = boto3.client("codebuild")
+    # boto3 is imported here so the helpers above can be used without paying for its import
+    import boto3
+    from botocore.config import Config
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stdout)
+
+    # Credentials from the environment make the EC2 instance metadata lookup unnecessary
+    if os.environ.get("AWS_ACCESS_KEY_ID") and os.environ.get("AWS_SECRET_ACCESS_KEY"):
+        os.environ.setdefault("AWS_EC2_METADATA_DISABLED", "true")
+
+    # Initialize Boto3 clients from one session so credentials and endpoints are resolved once
+    session = boto3.Session()
+    client_config = Config(retries=CLIENT_RETRIES, connect_timeout=CLIENT_CONNECT_TIMEOUT, read_timeout=CLIENT_READ_TIMEOUT)
+    cloudformation_client = session.client("cloudformation", config=client_config)
+    codebuild_client = session.client("codebuild", config=client_config)
 
     # Deploy Cognito stack
     cognito_parameters: dict = prompt_for_parameters("cognito")
     cognito_template: str = load_template(COGNITO_TEMPLATE_PATH)
-    deploy_stack(cloudformation_client, COGNITO_STACK_NAME, cognito_template, cognito_parameters)
-    cognito_outputs: dict = get_stack_outputs(cloudformation_client, COGNITO_STACK_NAME)
+    cognito_outputs = deploy_stack(cloudformation_client, COGNITO_STACK_NAME, cognito_template, cognito_parameters)
+    if cognito_outputs is None:
+        sys.exit(1)
 
     # Deploy CodeBuild stack
     codebuild_parameters: dict = prompt_for_parameters("codebuild")
     codebuild_parameters.update(cognito_outputs)  # Add Cognito outputs as parameters for CodeBuild stack
+    codebuild_parameters["ClientId"] = cognito_outputs["UserPoolClientId"]  # codebuild.yml declares this parameter as ClientId
     codebuild_template: str = load_template(CODEBUILD_TEMPLATE_PATH)
-    deploy_stack(cloudformation_client, CODEBUILD_STACK_NAME, codebuild_template, codebuild_parameters)
-    codebuild_outputs: dict = get_stack_outputs(cloudformation_client, CODEBUILD_STACK_NAME)
+    codebuild_outputs = deploy_stack(cloudformation_client, CODEBUILD_STACK_NAME, codebuild_template, codebuild_parameters)
+    if codebuild_outputs is None:
+        sys.exit(1)
 
     # Start CodeBuild project
     codebuild_project_name = codebuild_outputs["CodeBuildProjectName"]
@@ -166,7 +300,8 @@ def main() -> None:
     wait_for_codebuild_completion(codebuild_client, build_id)
 
     # Update configuration file with outputs from both stacks
-    config_updates: dict = {**cognito_outputs, **codebuild_outputs}
+    # The region is not a stack output, so record the one the stacks were deployed to
+    config_updates: dict = {**cognito_outputs, **codebuild_outputs, "UserPoolRegion": session.region_name}
     update_configuration_file(config_updates)
 
 